@@ -3,7 +3,7 @@
  * Creates enhanced gallery pages with styled tags and categorized notebooks
  */
 
-import { readFileSync, existsSync } from "fs";
+import { readFileSync, existsSync, statSync } from "fs";
 import { join } from "path";
 
 const plugin = {
@@ -23,10 +23,10 @@ const plugin = {
         try {
           const { category = "all", columns = "1 1 2 3" } = data.options || {};
 
-          // Load notebook metadata
-          const notebookData = loadNotebookMetadata();
+          // Load notebook metadata (parsed once and indexed by tag)
+          const { entries, byTag } = loadGalleryIndex();
 
-          if (!notebookData || Object.keys(notebookData).length === 0) {
+          if (entries.length === 0) {
             console.warn("No notebook metadata found");
             return [
               {
@@ -36,17 +36,9 @@ const plugin = {
             ];
           }
 
-          // Filter notebooks by category if specified
-          let notebooks = Object.entries(notebookData);
-
-          if (category !== "all") {
-            notebooks = notebooks.filter(([path, meta]) => {
-              // Safe checking for tags
-              if (!meta || !meta.tags) return false;
-              if (!Array.isArray(meta.tags)) return false;
-              return meta.tags.includes(category);
-            });
-          }
+          // Look up notebooks for the category in the tag index
+          const notebooks =
+            category === "all" ? entries : byTag.get(category) || [];
 
           if (notebooks.length === 0) {
             return [
@@ -237,13 +229,8 @@ const plugin = {
   ],
 };
 
-function loadNotebookMetadata() {
+function loadNotebookMetadata(metadataPath) {
   try {
-    const metadataPath = join(
-      process.cwd(),
-      "notebooks",
-      ".gallery-metadata.json",
-    );
     if (existsSync(metadataPath)) {
       const content = readFileSync(metadataPath, "utf8");
       return JSON.parse(content);
@@ -256,6 +243,40 @@ function loadNotebookMetadata() {
   }
 }
 
+let galleryIndex = null;
+
+function loadGalleryIndex() {
+  // Every gallery-grid directive needs the same metadata, so parse it once
+  // and build a tag -> notebooks index instead of filtering per directive.
+  // The metadata file's mtime is checked so `myst start` picks up changes.
+  const metadataPath = join(
+    process.cwd(),
+    "notebooks",
+    ".gallery-metadata.json",
+  );
+  const mtime = existsSync(metadataPath)
+    ? statSync(metadataPath).mtimeMs
+    : null;
+  if (galleryIndex && galleryIndex.mtime === mtime) {
+    return galleryIndex;
+  }
+
+  const entries = Object.entries(loadNotebookMetadata(metadataPath) || {});
+  const byTag = new Map();
+  for (const entry of entries) {
+    const meta = entry[1];
+    // Safe checking for tags
+    if (!meta || !Array.isArray(meta.tags)) continue;
+    for (const tag of new Set(meta.tags)) {
+      if (!byTag.has(tag)) byTag.set(tag, []);
+      byTag.get(tag).push(entry);
+    }
+  }
+
+  galleryIndex = { mtime, entries, byTag };
+  return galleryIndex;
+}
+
 function renderTags(tags, hasExplicitTags = false) {
   try {
     if (!tags || !Array.isArray(tags) || tags.length === 0) {
@@ -5,19 +5,194 @@ Supports both explicit tags in notebook metadata and automatic content analysis
 """
 
 import json
+import os
+import re
+import fnmatch
 import argparse
 from pathlib import Path
 from collections import Counter
-import nbformat
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import orjson  # Faster JSON decoding, optional
+except ImportError:
+    orjson = None
+
+try:
+    import yaml
+
+    # Prefer the libyaml-backed loader when PyYAML was built with it
+    YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+except ImportError:
+    yaml = None
+
+# Bump when the extracted notebook data changes shape to invalidate old caches
+CACHE_VERSION = 4
+CACHE_FILENAME = ".gallery-cache.json"
+
+# Whole import statement lines in a code cell (leading/trailing whitespace dropped)
+IMPORT_LINE_RE = re.compile(r"^[^\S\n]*((?:import|from) .*?\S)[^\S\n]*$", re.MULTILINE)
+
+# Only the first few imports of a notebook are kept in the metadata
+MAX_IMPORTS = 5
+
+# Closing "---" line of a YAML frontmatter block
+FRONTMATTER_END_RE = re.compile(r"^[^\S\n]*---[^\S\n]*$", re.MULTILINE)
+
+# Level-one markdown heading ("# Title"), used as a fallback notebook title
+HEADING_RE = re.compile(r"^[^\S\n]*# [^\S\n]*(\S.*?)[^\S\n]*$", re.MULTILINE)
+
+# Notebook file names to exclude from the gallery
+EXCLUDE_PATTERNS = [
+    "*template*",  # Any file with "template" in the name
+    "template.ipynb",  # Specific file
+]
+EXCLUDE_RE = re.compile("|".join(fnmatch.translate(p) for p in EXCLUDE_PATTERNS))
+
+# Markdown templates for the category pages: one gallery grid per subcategory
+CATEGORY_PAGE_TEMPLATE = """---
+title: {title}
+---
+
+# {title}
+
+{description}
+
+{sections}"""
+
+GALLERY_SECTION_TEMPLATE = """## {name}
+
+```{{gallery-grid}}
+:category: {category}
+:columns: 1 1 2 3
+```
+
+"""
+
+# Gallery categories: one page per category, one grid per subcategory tag
+GALLERY_CATEGORIES = {
+    "sentinel": {
+        "title": "Sentinel Data",
+        "description": "Notebooks showcasing Sentinel mission data processing and analysis",
+        "file": "gallery-sentinel.md",
+        "subcategories": {
+            "Sentinel-1": "sentinel-1",
+            "Sentinel-2": "sentinel-2",
+            "Sentinel-3": "sentinel-3",
+        },
+    },
+    "topics": {
+        "title": "Application Topics",
+        "description": "Notebooks organized by Earth observation application domains",
+        "file": "gallery-topics.md",
+        "subcategories": {
+            "Land Applications": "land",
+            "Emergency Response": "emergency",
+            "Climate Monitoring": "climate-change",
+            "Marine Applications": "marine",
+            "Security Applications": "security",
+        },
+    },
+    "tools": {
+        "title": "Tools & Libraries",
+        "description": "Notebooks demonstrating different software tools and libraries",
+        "file": "gallery-tools.md",
+        "subcategories": {
+            "Xarray": "xarray",
+            "Xarray-eopf Plugin": "xarray-eopf",
+            "XCube": "xcube",
+            "GDAL": "gdal",
+            "STAC": "stac",
+        },
+    },
+}
+
+# Main gallery page listing every tagged notebook
+GALLERY_INDEX_MD = """---
+title: Notebook Gallery
+---
+
+# Notebook Gallery
+
+```{gallery-grid}
+:category: all
+:columns: 1 1 2 3
+```
+
+<!-- Generated by gallery plugin -->
+"""
+
+
+def render_category_page(category):
+    """Render a category page with a gallery grid per subcategory"""
+    sections = "".join(
+        GALLERY_SECTION_TEMPLATE.format(name=name, category=tag)
+        for name, tag in category["subcategories"].items()
+    )
+    return CATEGORY_PAGE_TEMPLATE.format_map({**category, "sections": sections})
+
+
+# Gallery page file names and their content, rendered once at import
+GALLERY_PAGES = {
+    "gallery.md": GALLERY_INDEX_MD,
+    **{
+        category["file"]: render_category_page(category)
+        for category in GALLERY_CATEGORIES.values()
+    },
+}
+
+
+def cell_source(cell):
+    """Return a cell's source as a string (raw notebook JSON may store a list of lines)"""
+    source = cell.get("source", "")
+    if isinstance(source, list):
+        return "".join(source)
+    return source
+
+
+def iter_cells(nb, cell_types=("markdown", "code")):
+    """Yield (cell_type, source) for matching cells, never touching their outputs"""
+    for cell in nb.get("cells", []):
+        cell_type = cell.get("cell_type")
+        if cell_type in cell_types:
+            yield cell_type, cell_source(cell)
+
+
+def load_notebook_json(raw):
+    """Parse raw notebook bytes, using orjson when it is available"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def empty_notebook_data():
+    """Notebook data for a notebook without (readable) frontmatter"""
+    return {
+        "imports": [],
+        "explicit_tags": [],
+        "explicit_title": None,
+        "explicit_description": None,
+        "explicit_subtitle": None,
+        "explicit_authors": [],
+        "explicit_keywords": None,
+        "notebook_title": None,
+        "warnings": [],
+    }
 
 
 def extract_notebook_metadata_and_content(notebook_path):
     """Extract explicit tags and metadata from Jupyter notebook frontmatter only"""
     try:
-        with open(notebook_path, "r", encoding="utf-8") as f:
-            nb = nbformat.read(f, as_version=4)
+        raw = Path(notebook_path).read_bytes()
+
+        # Frontmatter needs a "---" line; without it there are no tags and the
+        # notebook is skipped anyway, so don't bother parsing the JSON
+        if b"---" not in raw:
+            return empty_notebook_data()
+
+        nb = load_notebook_json(raw)
 
-        content = []
         imports = []
         explicit_tags = []
         explicit_title = None
@@ -25,29 +200,25 @@ def extract_notebook_metadata_and_content(notebook_path):
         explicit_subtitle = None
         explicit_authors = []
         explicit_keywords = None
+        # Reported with the notebook's analysis (extraction may run in a worker)
+        warnings = []
 
         # Process cells - only look for YAML frontmatter in first markdown cell
-        for cell in nb.cells:
-            if cell.cell_type == "markdown":
-                source = cell.source
-                content.append(source)
-
+        for cell_type, source in iter_cells(nb):
+            if cell_type == "markdown":
                 # Check for YAML frontmatter in first markdown cell only
-                if source.strip().startswith("---"):
+                if yaml is not None and source.strip().startswith("---"):
                     try:
-                        import yaml
-
-                        # Extract YAML frontmatter
-                        lines = source.split("\n")
-                        yaml_end = -1
-                        for i, line in enumerate(lines[1:], 1):
-                            if line.strip() == "---":
-                                yaml_end = i
-                                break
+                        # Extract YAML frontmatter: from the second line up to
+                        # the next "---" line
+                        start = source.find("\n") + 1
+                        yaml_end = (
+                            FRONTMATTER_END_RE.search(source, start) if start else None
+                        )
 
-                        if yaml_end > 0:
-                            yaml_content = "\n".join(lines[1:yaml_end])
-                            frontmatter = yaml.safe_load(yaml_content)
+                        if yaml_end:
+                            yaml_content = source[start : yaml_end.start() - 1]
+                            frontmatter = yaml.load(yaml_content, Loader=YAML_LOADER)
 
                             # Extract metadata from frontmatter
                             if "title" in frontmatter:
@@ -76,53 +247,36 @@ def extract_notebook_metadata_and_content(notebook_path):
                                         ]
                                     )
 
-                    except ImportError:
-                        print("    ⚠️  PyYAML not available for frontmatter parsing")
                     except Exception as e:
-                        print(f"    ⚠️  Error parsing frontmatter: {e}")
+                        warnings.append(f"Error parsing frontmatter: {e}")
 
                 # Break after first markdown cell (frontmatter should be first)
                 break
 
-            elif cell.cell_type == "code":
-                source = cell.source
-                content.append(source)
-
-                # Extract imports
-                for line in source.split("\n"):
-                    line = line.strip()
-                    if line.startswith(("import ", "from ")) and not line.startswith(
-                        "#"
-                    ):
-                        imports.append(line)
+            elif cell_type == "code" and len(imports) < MAX_IMPORTS:
+                # Extract imports (keep looking for the frontmatter cell after)
+                imports.extend(IMPORT_LINE_RE.findall(source))
 
         # Generate description from subtitle if not explicitly set
         if not explicit_description and explicit_subtitle:
             explicit_description = explicit_subtitle
 
         return {
-            "content": " ".join(content),
             "imports": imports,
-            "explicit_tags": list(set(explicit_tags)),  # Remove duplicates
+            "explicit_tags": list(dict.fromkeys(explicit_tags)),  # Remove duplicates
             "explicit_title": explicit_title,
             "explicit_description": explicit_description,
             "explicit_subtitle": explicit_subtitle,
             "explicit_authors": explicit_authors,
             "explicit_keywords": explicit_keywords,
+            "notebook_title": extract_notebook_title(nb),
+            "warnings": warnings,
         }
 
     except Exception as e:
-        print(f"Error reading {notebook_path}: {e}")
-        return {
-            "content": "",
-            "imports": [],
-            "explicit_tags": [],
-            "explicit_title": None,
-            "explicit_description": None,
-            "explicit_subtitle": None,
-            "explicit_authors": [],
-            "explicit_keywords": None,
-        }
+        notebook_data = empty_notebook_data()
+        notebook_data["warnings"].append(f"Error reading {notebook_path}: {e}")
+        return notebook_data
 
 
 def enhanced_tag_detection(notebook_data, filename):
@@ -138,60 +292,54 @@ def enhanced_tag_detection(notebook_data, filename):
     return []
 
 
+def iter_notebook_paths(directory):
+    """Yield notebook paths below directory, pruning hidden files and folders"""
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return
+
+    with entries:
+        for entry in entries:
+            # Skip hidden entries (e.g. .ipynb_checkpoints) without descending
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_notebook_paths(entry.path)
+            elif entry.name.endswith(".ipynb"):
+                yield Path(entry.path)
+
+
 def find_all_notebooks(root_dir):
     """Find all notebooks in directory structure, excluding templates"""
     notebook_files = []
-    root_path = Path(root_dir)
-
-    # Files to exclude from gallery
-    exclude_patterns = [
-        "*template*",  # Any file with "template" in the name
-        "template.ipynb",  # Specific file
-    ]
-
-    for notebook_file in root_path.rglob("*.ipynb"):
-        # Skip hidden files and checkpoint files
-        if any(part.startswith(".") for part in notebook_file.parts):
-            continue
 
+    # Hidden directories are pruned by the walk itself
+    for notebook_file in iter_notebook_paths(Path(root_dir)):
         # Skip template files
-        should_exclude = False
-        for pattern in exclude_patterns:
-            if notebook_file.match(pattern):
-                print(f"    🚫 Excluding template: {notebook_file.name}")
-                should_exclude = True
-                break
+        if EXCLUDE_RE.match(notebook_file.name):
+            print(f"    🚫 Excluding template: {notebook_file.name}")
+            continue
 
-        if not should_exclude:
-            notebook_files.append(notebook_file)
+        notebook_files.append(notebook_file)
 
     return notebook_files
 
 
-def extract_notebook_title(notebook_path):
-    """Extract title from notebook metadata or first heading"""
-    try:
-        with open(notebook_path, "r", encoding="utf-8") as f:
-            nb = nbformat.read(f, as_version=4)
-
-        # Check notebook metadata first
-        if "title" in nb.metadata:
-            return nb.metadata["title"]
+def extract_notebook_title(nb):
+    """Extract title from parsed notebook metadata or first heading"""
+    # Check notebook metadata first
+    metadata = nb.get("metadata", {})
+    if "title" in metadata:
+        return metadata["title"]
 
-        # Look for first markdown heading
-        for cell in nb.cells:
-            if cell.cell_type == "markdown":
-                lines = cell.source.split("\n")
-                for line in lines:
-                    line = line.strip()
-                    if line.startswith("# "):
-                        return line[2:].strip()
+    # Look for first markdown heading
+    for _, source in iter_cells(nb, ("markdown",)):
+        match = HEADING_RE.search(source)
+        if match:
+            return match.group(1)
 
-        # Fallback to filename
-        return notebook_path.stem.replace("-", " ").replace("_", " ").title()
-
-    except Exception:
-        return notebook_path.stem.replace("-", " ").replace("_", " ").title()
+    return None
 
 
 def enhanced_title_extraction(notebook_path, notebook_data):
@@ -201,8 +349,12 @@ def enhanced_title_extraction(notebook_path, notebook_data):
     if notebook_data["explicit_title"]:
         return notebook_data["explicit_title"]
 
-    # Fall back to existing extraction logic
-    return extract_notebook_title(notebook_path)
+    # Fall back to notebook metadata or first heading (same parse)
+    if notebook_data["notebook_title"] is not None:
+        return notebook_data["notebook_title"]
+
+    # Fallback to filename
+    return notebook_path.stem.replace("-", " ").replace("_", " ").title()
 
 
 def render_tags_html(tags, has_explicit_tags=False, max_visible=3):
@@ -213,20 +365,20 @@ def render_tags_html(tags, has_explicit_tags=False, max_visible=3):
     visible_tags = tags[:max_visible]
     remaining_count = len(tags) - max_visible
 
-    tag_html = '<div class="gallery-tags">'
+    parts = ['<div class="gallery-tags">']
 
-    # Render visible tags
-    for tag in visible_tags:
-        # Normalize tag name for CSS class
-        css_class = tag.replace("-", "-").replace("_", "-")
-        tag_html += f'<span class="tag {css_class}">{tag}</span>'
+    # Render visible tags (CSS class names use dashes)
+    parts.extend(
+        f'<span class="tag {tag.replace("_", "-")}">{tag}</span>'
+        for tag in visible_tags
+    )
 
     # Add "more" indicator if there are additional tags
     if remaining_count > 0:
-        tag_html += f'<span class="tag-more">+{remaining_count} more</span>'
+        parts.append(f'<span class="tag-more">+{remaining_count} more</span>')
 
-    tag_html += "</div>"
-    return tag_html
+    parts.append("</div>")
+    return "".join(parts)
 
 
 def render_simple_tags(tags, has_explicit_tags=False, max_visible=3):
@@ -246,190 +398,40 @@ def render_simple_tags(tags, has_explicit_tags=False, max_visible=3):
     return tag_text
 
 
-def generate_gallery_pages(notebook_tags, output_dir="notebooks"):
-    """Generate MyST gallery pages with enhanced styling"""
-
-    categories = {
-        "sentinel": {
-            "title": "Sentinel Data",
-            "description": "Notebooks showcasing Sentinel mission data processing and analysis",
-            "file": f"{output_dir}/gallery-sentinel.md",
-        },
-        "topics": {
-            "title": "Application Topics",
-            "description": "Notebooks organized by Earth observation application domains",
-            "file": f"{output_dir}/gallery-topics.md",
-        },
-        "tools": {
-            "title": "Tools & Libraries",
-            "description": "Notebooks demonstrating different software tools and libraries",
-            "file": f"{output_dir}/gallery-tools.md",
-        },
-    }
-
-    # Create output directory if it doesn't exist
-    Path(output_dir).mkdir(exist_ok=True)
-
-    # Generate main gallery index
-    with open(f"{output_dir}/gallery.md", "w") as f:
-        f.write(
-            """---
-title: Notebook Gallery
----
-
-# Notebook Gallery
-
-```{gallery-grid}
-:category: all
-:columns: 1 1 2 3
-```
-
-"""
-        )
-
-        f.write("<!-- Generated by gallery plugin -->\n")
-
-    # Generate Sentinel category page
-    with open(categories["sentinel"]["file"], "w") as f:
-        f.write(
-            f"""---
-title: {categories["sentinel"]["title"]}
----
-
-# {categories["sentinel"]["title"]}
-
-{categories["sentinel"]["description"]}
-
-## Sentinel-1
-
-```{{gallery-grid}}
-:category: sentinel-1
-:columns: 1 1 2 3
-```
-
-## Sentinel-2
-
-```{{gallery-grid}}
-:category: sentinel-2
-:columns: 1 1 2 3
-```
-
-## Sentinel-3
-
-```{{gallery-grid}}
-:category: sentinel-3
-:columns: 1 1 2 3
-```
-
-"""
-        )
-
-    # Generate Topics category page
-    with open(categories["topics"]["file"], "w") as f:
-        f.write(
-            f"""---
-title: {categories["topics"]["title"]}
----
-
-# {categories["topics"]["title"]}
-
-{categories["topics"]["description"]}
-
-## Land Applications
-
-```{{gallery-grid}}
-:category: land
-:columns: 1 1 2 3
-```
-
-## Emergency Response
-
-```{{gallery-grid}}
-:category: emergency
-:columns: 1 1 2 3
-```
-
-## Climate Monitoring
-
-```{{gallery-grid}}
-:category: climate-change
-:columns: 1 1 2 3
-```
-
-## Marine Applications
-
-```{{gallery-grid}}
-:category: marine
-:columns: 1 1 2 3
-```
-
-## Security Applications
-
-```{{gallery-grid}}
-:category: security
-:columns: 1 1 2 3
-```
-
-"""
-        )
-
-    # Generate Tools category page
-    with open(categories["tools"]["file"], "w") as f:
-        f.write(
-            f"""---
-title: {categories["tools"]["title"]}
----
-
-# {categories["tools"]["title"]}
-
-{categories["tools"]["description"]}
-
-## Xarray
-
-```{{gallery-grid}}
-:category: xarray
-:columns: 1 1 2 3
-```
-
-## Xarray-eopf Plugin
-
-```{{gallery-grid}}
-:category: xarray-eopf
-:columns: 1 1 2 3
-```
-
-## XCube
-
-```{{gallery-grid}}
-:category: xcube
-:columns: 1 1 2 3
-```
+def write_text_atomic(path, text):
+    """Write text via a temporary file and rename, so readers never see a partial file
 
-## GDAL
+    Files that already hold exactly this text are left untouched, so their
+    mtime (and any build cache keyed on it) survives unchanged runs.
+    """
+    path = Path(path)
+    data = text.encode("utf-8")
+    try:
+        if path.read_bytes() == data:
+            return
+    except OSError:
+        pass
 
-```{{gallery-grid}}
-:category: gdal
-:columns: 1 1 2 3
-```
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
 
-## STAC
 
-```{{gallery-grid}}
-:category: stac
-:columns: 1 1 2 3
-```
+def generate_gallery_pages(notebook_tags, output_dir="notebooks"):
+    """Generate MyST gallery pages with enhanced styling"""
+    # Create output directory if it doesn't exist
+    Path(output_dir).mkdir(exist_ok=True)
 
-"""
-        )
+    # Page content never depends on the notebooks; the cards come from the plugin
+    for filename, text in GALLERY_PAGES.items():
+        write_text_atomic(Path(output_dir) / filename, text)
 
 
 def analyze_notebook_content(notebook_tags):
     """Provide analysis of what was found"""
-    tag_counts = Counter()
-
-    for path, meta in notebook_tags.items():
-        for tag in meta["tags"]:
-            tag_counts[tag] += 1
+    tag_counts = Counter(
+        chain.from_iterable(meta["tags"] for meta in notebook_tags.values())
+    )
 
     print("\n📊 Content Analysis Summary:")
     print("=" * 50)
@@ -446,7 +448,40 @@ def analyze_notebook_content(notebook_tags):
         print(f"  {folder}: {count} notebooks")
 
 
-def analyze_notebooks(root_dir="notebooks"):
+def load_notebook_cache(cache_file):
+    """Load cached notebook data, ignoring missing, unreadable or outdated caches"""
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache.get("notebooks", {})
+
+
+def is_json_serializable(data):
+    """Check whether data can be stored in the JSON notebook cache"""
+    try:
+        json.dumps(data)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def save_notebook_cache(cache_file, cached_notebooks):
+    """Save extracted notebook data keyed by notebook path"""
+    try:
+        write_text_atomic(
+            cache_file,
+            json.dumps({"version": CACHE_VERSION, "notebooks": cached_notebooks}),
+        )
+    except OSError as e:
+        print(f"    ⚠️  Could not write notebook cache {cache_file}: {e}")
+
+
+def analyze_notebooks(root_dir="notebooks", use_cache=True, jobs=None):
     """Analyze all notebooks and extract tags from frontmatter"""
     print(f"🔍 Analyzing notebooks in {root_dir} for frontmatter tags...")
 
@@ -454,16 +489,82 @@ def analyze_notebooks(root_dir="notebooks"):
 
     print(f"📓 Found {len(notebook_files)} Jupyter notebooks")
 
+    if yaml is None:
+        print("⚠️  PyYAML not available for frontmatter parsing")
+        # Records extracted without PyYAML have no tags: don't reuse or keep them
+        use_cache = False
+
+    # Reuse extracted data for notebooks whose mtime and size are unchanged
+    cache_file = Path(root_dir) / CACHE_FILENAME
+    cache = load_notebook_cache(cache_file) if use_cache else {}
+    cached_notebooks = {}
+    all_notebook_data = {}
+    changed_files = []
+    relative_paths = {}
+
+    for file_path in notebook_files:
+        stat = file_path.stat()
+        # POSIX-style path relative to the root, computed once per notebook
+        cache_key = os.path.relpath(file_path, root_dir).replace(os.sep, "/")
+        relative_paths[file_path] = cache_key
+        entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+        cached = cache.get(cache_key)
+        if (
+            cached
+            and cached.get("mtime_ns") == entry["mtime_ns"]
+            and cached.get("size") == entry["size"]
+        ):
+            entry["data"] = cached["data"]
+            all_notebook_data[file_path] = cached["data"]
+        else:
+            changed_files.append(file_path)
+        cached_notebooks[cache_key] = entry
+
+    if use_cache:
+        print(f"♻️  Reusing cached data for {len(all_notebook_data)} notebooks")
+
+    # Extract changed notebooks in parallel (one file per task), or in this
+    # process when a single job is requested
+    if changed_files:
+        if jobs == 1:
+            extracted = list(map(extract_notebook_metadata_and_content, changed_files))
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                extracted = list(
+                    executor.map(
+                        extract_notebook_metadata_and_content,
+                        changed_files,
+                        chunksize=4,
+                    )
+                )
+
+        for file_path, notebook_data in zip(changed_files, extracted):
+            all_notebook_data[file_path] = notebook_data
+            cache_key = relative_paths[file_path]
+            if notebook_data["warnings"]:
+                # Extract failed notebooks again so their warnings show every run
+                del cached_notebooks[cache_key]
+            elif not is_json_serializable(notebook_data):
+                # Frontmatter may hold YAML values JSON cannot store (e.g. dates);
+                # only this notebook is extracted again next run
+                del cached_notebooks[cache_key]
+            else:
+                cached_notebooks[cache_key]["data"] = notebook_data
+
+    if use_cache:
+        save_notebook_cache(cache_file, cached_notebooks)
+
     notebook_tags = {}
     skipped_count = 0
 
     for file_path in notebook_files:
         print(f"  🔎 Analyzing: {file_path.name}")
+        notebook_data = all_notebook_data[file_path]
+        for warning in notebook_data["warnings"]:
+            print(f"    ⚠️  {warning}")
 
-        # Extract notebook metadata and content
-        notebook_data = extract_notebook_metadata_and_content(file_path)
-
-        relative_path = str(file_path.relative_to(root_dir)).replace("\\", "/")
+        relative_path = relative_paths[file_path]
+        folder = relative_path.rpartition("/")[0] or "root"
         if relative_path.endswith(".ipynb"):
             relative_path = relative_path[:-6]  # Remove .ipynb extension
 
@@ -479,12 +580,8 @@ def analyze_notebooks(root_dir="notebooks"):
                 "description": notebook_data["explicit_description"] or "",
                 "tags": tags,
                 "full_path": str(file_path),
-                "folder": (
-                    str(file_path.parent.relative_to(root_dir))
-                    if file_path.parent != Path(root_dir)
-                    else "root"
-                ),
-                "imports": notebook_data["imports"][:5],
+                "folder": folder,
+                "imports": notebook_data["imports"][:MAX_IMPORTS],
                 "has_explicit_tags": bool(notebook_data["explicit_tags"]),
             }
         else:
@@ -498,6 +595,15 @@ def analyze_notebooks(root_dir="notebooks"):
     return notebook_tags
 
 
+def dump_metadata_json(data):
+    """Serialize plugin metadata as indented JSON with sorted keys (reproducible output)"""
+    if orjson is not None:
+        return orjson.dumps(
+            data, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+        ).decode()
+    return json.dumps(data, indent=2, sort_keys=True, ensure_ascii=False)
+
+
 def export_metadata_for_plugin(notebook_tags, output_dir="notebooks"):
     """Export notebook metadata for MyST plugin"""
     metadata_file = Path(output_dir) / ".gallery-metadata.json"
@@ -513,8 +619,7 @@ def export_metadata_for_plugin(notebook_tags, output_dir="notebooks"):
             "folder": meta["folder"],
         }
 
-    with open(metadata_file, "w") as f:
-        json.dump(plugin_metadata, f, indent=2)
+    write_text_atomic(metadata_file, dump_metadata_json(plugin_metadata))
 
     print(f"✅ Exported metadata: {metadata_file}")
 
@@ -571,6 +676,14 @@ date: 2025-03-04
     print("\n🚫 To disable auto-tagging: python generate_gallery.py --no-auto-tag")
 
 
+def positive_int(value):
+    """argparse type for counts that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
 def parse_arguments():
     """Parse command line arguments"""
     parser = argparse.ArgumentParser(
@@ -581,6 +694,8 @@ Examples:
   python generate_gallery.py                    # Generate gallery from notebooks/
   python generate_gallery.py --dir my_notebooks # Custom directory
   python generate_gallery.py --verbose          # Verbose output
+  python generate_gallery.py --no-cache         # Ignore cached notebook data
+  python generate_gallery.py --jobs 1           # Read notebooks sequentially
         """,
     )
 
@@ -595,6 +710,20 @@ Examples:
         "--verbose", "-v", action="store_true", help="Enable verbose output"
     )
 
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=positive_int,
+        default=None,
+        help="Number of processes used to read notebooks (default: all CPUs, 1 = no pool)",
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Re-read every notebook instead of reusing {CACHE_FILENAME}",
+    )
+
     return parser.parse_args()
 
 
@@ -604,19 +733,6 @@ if __name__ == "__main__":
 
     ROOT_DIR = args.dir
 
-    # Clean up existing gallery files first
-    gallery_files = [
-        f"{ROOT_DIR}/gallery.md",
-        f"{ROOT_DIR}/gallery-sentinel.md",
-        f"{ROOT_DIR}/gallery-topics.md",
-        f"{ROOT_DIR}/gallery-tools.md",
-    ]
-    for file_path in gallery_files:
-        if Path(file_path).exists():
-            Path(file_path).unlink()
-            if args.verbose:
-                print(f"🗑️  Removed old {file_path}")
-
     # Display configuration
     print("🧠 Notebook Gallery Generator")
     print("=" * 40)
@@ -625,7 +741,9 @@ if __name__ == "__main__":
     print()
 
     print("🔍 Starting notebook analysis...")
-    notebook_tags = analyze_notebooks(ROOT_DIR)
+    notebook_tags = analyze_notebooks(
+        ROOT_DIR, use_cache=not args.no_cache, jobs=args.jobs
+    )
 
     if notebook_tags:
         analyze_notebook_content(notebook_tags)
@@ -667,6 +785,14 @@ if __name__ == "__main__":
 
         print("\n💡 All notebooks use YAML frontmatter tags")
     else:
+        # Remove gallery pages left over from earlier runs
+        for filename in GALLERY_PAGES:
+            file_path = Path(ROOT_DIR) / filename
+            if file_path.exists():
+                file_path.unlink()
+                if args.verbose:
+                    print(f"🗑️  Removed old {file_path}")
+
         print("❌ No notebooks found with tags.")
         print(
             "💡 Add frontmatter tags to your notebooks or check your notebook directory"
@@ -1,7 +1,6 @@
 import sys
 from typing import Dict
 
-import dask.array as da
 import xarray as xr
 from dask.base import compute
 from dask.delayed import delayed
@@ -11,8 +10,9 @@ from skimage.filters import sobel
 from xarray import DataArray
 
 import gc
+import threading
 from functools import lru_cache
-from random import sample, seed
+from random import Random
 from typing import Tuple
 
 import numpy as np
@@ -27,9 +27,82 @@ model_names = [
 ]
 
 
-@lru_cache(maxsize=1)
+# One inference session per model path, shared by all blocks in this process
+ort_session_cache = {}
+ort_session_lock = threading.Lock()
+
+
+def get_ort_session(path):
+    session = ort_session_cache.get(path)
+    if session is None:
+        # Parallel blocks may ask at the same time: load each model only once
+        with ort_session_lock:
+            session = ort_session_cache.get(path)
+            if session is None:
+                session = ort_session_cache[path] = ort.InferenceSession(path)
+    return session
+
+
 def load_ort_sessions(names):
-    return [ort.InferenceSession(f"onnx_models/{name}") for name in names]
+    return [get_ort_session(f"onnx_models/{name}") for name in names]
+
+
+# Per session: whether batched runs were checked to match per-sample runs
+ort_batch_support = {}
+
+
+def run_ort_batch(ort_session, input_name, inputs):
+    # One output per input from a single run, or None if the model cannot do it
+    # (exports may fix the batch internally or flatten the output rows)
+    try:
+        outputs = ort_session.run(None, {input_name: np.concatenate(inputs)})[0]
+    except Exception:
+        return None
+    pixels = inputs[0].shape[1]
+    if outputs.shape[0] != len(inputs) or outputs.size != len(inputs) * pixels:
+        return None
+    return list(outputs)
+
+
+def run_ort_predictions(ort_session, inputs):
+    model_input = ort_session.get_inputs()[0]
+    # None: not checked yet; fixed batch sizes are never batched
+    supported = ort_batch_support.get(ort_session)
+    if isinstance(model_input.shape[0], int):
+        supported = False
+
+    batched = None
+    if supported is not False:
+        batched = run_ort_batch(ort_session, model_input.name, inputs)
+        if supported and batched is not None:
+            return batched
+
+    outputs = [
+        ort_session.run(None, {model_input.name: input_data})[0]
+        for input_data in inputs
+    ]
+    if supported is None:
+        # First window for this session: only batch if the results agree
+        supported = batched is not None and all(
+            np.allclose(batch_output.ravel(), output.ravel(), rtol=1e-4, atol=1e-5)
+            for batch_output, output in zip(batched, outputs)
+        )
+        ort_batch_support[ort_session] = supported
+        if not supported:
+            inspect(
+                "Batched inference does not match single runs -> one run per sample"
+            )
+    return outputs
+
+
+# Reproducible random selection: the time steps used by each prediction only
+# depend on the number of images, so they are drawn once per image count
+@lru_cache(maxsize=None)
+def sample_image_indices(no_images, predictions_per_model, no_rand_images):
+    return tuple(
+        tuple(Random(i).sample(range(no_images), k=no_rand_images))
+        for i in range(predictions_per_model)
+    )
 
 
 def inspect(message):
@@ -48,11 +121,9 @@ def preprocess_datacube(
     nvdi_stack = nvdi_stack.where(lambda x: x < 0.92, 0.92)
     nvdi_stack = nvdi_stack.where(lambda x: x > -0.08)
     nvdi_stack += 0.08
-    # Count invalid pixels per time step
+    # Count invalid pixels per time step (one null mask for both statistics)
     sum_invalid = nvdi_stack.isnull().sum(dim=["x", "y"])
-    sum_invalid_mean = nvdi_stack.isnull().mean(dim=["x", "y"])
-    # Fill invalid pixels with 0
-    nvdi_stack_data = nvdi_stack.fillna(0)
+    sum_invalid_mean = sum_invalid / (nvdi_stack.sizes["x"] * nvdi_stack.sizes["y"])
 
     # Check if data is valid (at least min_images time steps with <100% invalid pixels)
     if (sum_invalid_mean.data < 1).sum() <= min_images:
@@ -61,6 +132,9 @@ def preprocess_datacube(
         nan_data = nan_data.where(lambda x: x > 1)  # Creates NaN array
         return True, nan_data
 
+    # Fill invalid pixels with 0
+    nvdi_stack_data = nvdi_stack.fillna(0)
+
     # Select valid data
     if (sum_invalid.data == 0).sum() >= min_images:
         good_data = nvdi_stack_data.sel(
@@ -75,62 +149,44 @@ def preprocess_datacube(
 
 # Prediction function from udf_segmentation.py
 def process_window_onnx(ndvi_stack: xr.DataArray, patch_size=128) -> xr.DataArray:
-    ort_sessions = load_ort_sessions(
-        tuple(model_names)
-    )  # Convert list to tuple for caching
+    ort_sessions = load_ort_sessions(model_names)
     predictions_per_model = 4
     no_rand_images = 3
     no_images = ndvi_stack.sizes["t"]
-    images_range = range(no_images)
     prediction = []
 
-    for ort_session in ort_sessions:
-        for i in range(predictions_per_model):
-            seed(i)  # Reproducible random selection
-            idx = sample(images_range, k=no_rand_images)
-            # Check if selected images span different weeks (optional logging)
-            weeks = set(ndvi_stack.isel(t=idx).t.dt.isocalendar().week.values)
-            if len(weeks) != no_rand_images:
-                inspect(
-                    "Time difference is not larger than a week for good parcel delineation"
-                )
-            # Prepare input data
-            input_data = ndvi_stack.isel(t=idx).data.reshape(
-                1, patch_size * patch_size, no_rand_images
+    # Load the stack into memory once; every prediction picks three time steps
+    stack = np.asarray(ndvi_stack.values, dtype=np.float32)
+    weeks_per_image = ndvi_stack.t.dt.isocalendar().week.values
+
+    # The same inputs are fed to every model
+    inputs = []
+    for idx in sample_image_indices(no_images, predictions_per_model, no_rand_images):
+        idx = list(idx)
+        # Check if selected images span different weeks (optional logging)
+        if len(set(weeks_per_image[idx])) != no_rand_images:
+            inspect(
+                "Time difference is not larger than a week for good parcel delineation"
             )
-            if input_data.ndim == 3:
-                input_data = input_data[
-                    np.newaxis, ...
-                ]  # shape: (1, C, H, W) or (1, H, W, C)
-
-            if isinstance(input_data, da.Array):
-                input_data = input_data.compute()
-
-            if input_data.dtype != np.float32:
-                input_data = input_data.astype(np.float32)
-
-            if len(input_data.shape) == 4:
-                input_data = np.squeeze(
-                    input_data, axis=0
-                )  # Remove singleton dimension if present
+        # Prepare input data, shape: (1, pixels, images)
+        inputs.append(
+            stack[:, :, idx].reshape(1, patch_size * patch_size, no_rand_images)
+        )
 
-            ort_inputs = {ort_session.get_inputs()[0].name: input_data}
-            ort_outputs = ort_session.run(None, ort_inputs)
-            prediction.append(ort_outputs[0].reshape((patch_size, patch_size)))
+    for ort_session in ort_sessions:
+        outputs = run_ort_predictions(ort_session, inputs)
+        prediction.extend(
+            output.reshape((patch_size, patch_size)) for output in outputs
+        )
 
     gc.collect()  # Free memory
 
-    # Create DataArray of predictions and take median
-    all_predictions = xr.DataArray(
-        prediction,
-        dims=["predict", "x", "y"],
-        coords={
-            "predict": range(len(prediction)),
-            "x": ndvi_stack.coords["x"],
-            "y": ndvi_stack.coords["y"],
-        },
+    # Take the median over all predictions (model outputs have no NaN to skip)
+    return xr.DataArray(
+        np.median(np.stack(prediction), axis=0),
+        dims=["x", "y"],
+        coords={"x": ndvi_stack.coords["x"], "y": ndvi_stack.coords["y"]},
     )
-    return all_predictions.median(dim="predict")
 
 
 # Main function to apply segmentation locally
@@ -176,10 +232,10 @@ def apply_segmentation(ndvi: xr.DataArray) -> xr.DataArray:
 
             # Extract central 64x64 pixels from the prediction
             central_prediction = prediction.isel(x=slice(32, 96), y=slice(32, 96))
-            predictions.append(central_prediction)
+            predictions.append(((i, j), central_prediction))
 
     # Combine all central predictions into a single DataArray
-    output = xr.combine_by_coords(predictions)
+    output = merge_central_predictions(ndvi, predictions, nx, ny, stride)
 
     # Mimic OpenEO output format (optional)
     year = ndvi.time.dt.year.values[0] if "time" in ndvi.coords else 0
@@ -188,9 +244,26 @@ def apply_segmentation(ndvi: xr.DataArray) -> xr.DataArray:
     return output
 
 
+def merge_central_predictions(
+    ndvi: xr.DataArray, predictions, nx: int, ny: int, stride: int
+) -> xr.DataArray:
+    # The central predictions tile the unpadded grid exactly, so write each one
+    # at its block offset instead of combining them by coordinates
+    output = np.full((nx * stride, ny * stride), np.nan, dtype=np.float32)
+    for (i, j), central_prediction in predictions:
+        output[i * stride : (i + 1) * stride, j * stride : (j + 1) * stride] = (
+            central_prediction.transpose("x", "y").values
+        )
+    return xr.DataArray(
+        output,
+        dims=["x", "y"],
+        coords={"x": ndvi["x"][: nx * stride], "y": ndvi["y"][: ny * stride]},
+    )
+
+
 @delayed
 def process_block(
-    block: xr.DataArray, i: int, j: int, block_size: int, min_images: int = 4
+    block: xr.DataArray, block_size: int, min_images: int = 4
 ) -> xr.DataArray:
     invalid_data, ndvi_stack = preprocess_datacube(block, min_images=min_images)
     if invalid_data:
@@ -198,10 +271,29 @@ def process_block(
     else:
         prediction = process_window_onnx(ndvi_stack, patch_size=block_size)
     # Extract central prediction
-    central_prediction = prediction.isel(x=slice(32, 96), y=slice(32, 96))
-    # Add metadata for merging
-    central_prediction.attrs["block_indices"] = (i, j)
-    return central_prediction
+    return prediction.isel(x=slice(32, 96), y=slice(32, 96))
+
+
+def count_valid_images(
+    padded: xr.DataArray, nx: int, ny: int, stride: int
+) -> np.ndarray:
+    # Number of time steps with at least one valid pixel in each block, using the
+    # same rule as preprocess_datacube (only values <= -0.08 are invalid)
+    if "bands" in padded.dims:
+        padded = padded.isel(bands=0)
+    valid = (padded > -0.08) | padded.isnull()
+    # Any valid pixel per stride x stride cell; a block covers 2 x 2 cells
+    cells = (
+        valid.isel(x=slice(0, (nx + 1) * stride), y=slice(0, (ny + 1) * stride))
+        .coarsen(x=stride, y=stride)
+        .any()
+        .transpose("t", "x", "y")
+        .values
+    )
+    blocks = (
+        cells[:, :-1, :-1] | cells[:, 1:, :-1] | cells[:, :-1, 1:] | cells[:, 1:, 1:]
+    )
+    return blocks.sum(axis=0)
 
 
 def apply_segmentation_parallel(ndvi: xr.DataArray) -> xr.DataArray:
@@ -209,28 +301,40 @@ def apply_segmentation_parallel(ndvi: xr.DataArray) -> xr.DataArray:
         ndvi = ndvi.rename({"time": "t"})
 
     padded = ndvi.pad(x=(32, 32), y=(32, 32), mode="constant", constant_values=0)
-    block_size, stride = 128, 64
+    block_size, stride, min_images = 128, 64, 4
     nx = (padded.sizes["x"] - block_size) // stride + 1
     ny = (padded.sizes["y"] - block_size) // stride + 1
 
+    # Blocks without enough valid images would only produce NaN: leave them out
+    # of the task graph, the merged output is NaN where no prediction is written
+    valid_images = count_valid_images(padded, nx, ny, stride)
+    skipped = int((valid_images <= min_images).sum())
+    if skipped:
+        inspect(f"Skipping {skipped} blocks with too few valid images")
+
+    block_indices = []
     delayed_predictions = []
     for i in range(nx):
         for j in range(ny):
+            if valid_images[i, j] <= min_images:
+                continue
             start_x = i * stride
             start_y = j * stride
             block = padded.isel(
                 x=slice(start_x, start_x + block_size),
                 y=slice(start_y, start_y + block_size),
             )
-            delayed_prediction = process_block(block, i, j, block_size)
-            delayed_predictions.append(delayed_prediction)
+            block_indices.append((i, j))
+            delayed_predictions.append(process_block(block, block_size, min_images))
 
     # Compute all blocks in parallel
     with ProgressBar():
         computed_predictions = compute(*delayed_predictions)
 
     # Reconstruct output array
-    merged = xr.combine_by_coords(computed_predictions, combine_attrs="override")
+    merged = merge_central_predictions(
+        ndvi, zip(block_indices, computed_predictions), nx, ny, stride
+    )
 
     # Add time/band dimension
     year = ndvi.t.dt.year.values[0] if "t" in ndvi.coords else 0